@@ -1,5 +1,5 @@
+import numpy as np
 import pygame
-import random
 import sys
 
 # --- Pygame Initialization ---
@@ -26,6 +26,25 @@ TEXT_COLOR = (255, 255, 255) # White
 HIGHLIGHT_COLOR = (200, 200, 200) # Light grey for selection
 BUTTON_COLOR = (50, 50, 50)
 HOVER_COLOR = (80, 80, 80)
+# Groups of blocks are passed around as parallel (rows, cols) int16 arrays
+NO_SELECTION = (np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int16))
+
+FPS = 60 # Frame rate cap for the menu and game loops
+
+# Button and label positions (fixed, so built once)
+START_BUTTON_RECT = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 50, 200, 60)
+SETTINGS_BUTTON_RECT = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 30, 200, 60)
+QUIT_BUTTON_RECT = pygame.Rect(SCREEN_WIDTH - 150, 10, 140, 40)
+COLORS_ROW_Y = 150 # Y position of the "Number of Colors" setting
+WIDTH_ROW_Y = COLORS_ROW_Y + 70
+HEIGHT_ROW_Y = WIDTH_ROW_Y + 70
+COLORS_MINUS_RECT = pygame.Rect(SCREEN_WIDTH // 2 + 100, COLORS_ROW_Y, 40, 30)
+COLORS_PLUS_RECT = pygame.Rect(SCREEN_WIDTH // 2 + 150, COLORS_ROW_Y, 40, 30)
+WIDTH_MINUS_RECT = pygame.Rect(SCREEN_WIDTH // 2 + 100, WIDTH_ROW_Y, 40, 30)
+WIDTH_PLUS_RECT = pygame.Rect(SCREEN_WIDTH // 2 + 150, WIDTH_ROW_Y, 40, 30)
+HEIGHT_MINUS_RECT = pygame.Rect(SCREEN_WIDTH // 2 + 100, HEIGHT_ROW_Y, 40, 30)
+HEIGHT_PLUS_RECT = pygame.Rect(SCREEN_WIDTH // 2 + 150, HEIGHT_ROW_Y, 40, 30)
+BACK_BUTTON_RECT = pygame.Rect(SCREEN_WIDTH // 2 - 75, HEIGHT_ROW_Y + 100, 150, 50)
 
 # --- Setup Screen ---
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -33,11 +52,26 @@ pygame.display.set_caption("SameGame")
 font = pygame.font.Font(None, 36) # Default font, size 36
 large_font = pygame.font.Font(None, 48) # Default font, size 48
 medium_font = pygame.font.Font(None, 30) # Medium font for settings
+clock = pygame.time.Clock()
 
 # --- Game Variables (now with adjustable defaults) ---
-board = []
+board_padded = np.empty((2, 2), dtype=np.int8) # Board plus a one-cell border of -2 that matches no color
+board = board_padded[1:-1, 1:-1] # Color index per cell, -1 for empty (a view into board_padded)
+labels = np.empty((0, 0), dtype=np.int32) # Group id per cell, -1 for empty; rebuilt by relabel
+label_sizes = {} # Group id -> number of blocks in the group
+cells_by_label = {} # Group id -> (rows, cols) int16 arrays of the group's blocks
+label_sweep = None # Disjoint-set sweep specialized for the current board size, set in create_board
 score = 0
-selected_blocks = []
+selected_label = -1 # Group id of the highlighted group, -1 for none
+board_surface = pygame.Surface((0, 0)) # Off-screen copy of the rendered board
+x_of_col = [] # Pixel offset of each column within board_surface, rebuilt in create_board
+y_of_row = [] # Pixel offset of each row within board_surface, rebuilt in create_board
+block_positions = [] # (x, y) offset of each cell in board.ravel() order, rebuilt in create_board
+block_tiles = [] # Pre-rendered block Surface per color index, rebuilt in create_board
+text_cache = {} # Rendered text Surfaces keyed by (font, text, color)
+board_dirty = True # Set whenever the board changes so draw_board re-renders it
+dirty_rects = [] # Screen areas to push to the display at the end of the frame
+drawn_state = {} # What each tracked screen element showed last frame, as key -> (state, rect)
 game_over = False
 player_won = False # New variable to track win condition
 
@@ -60,7 +94,7 @@ def create_board():
     Initializes the game board with random colored blocks based on current settings.
     Dynamically calculates block size and margins.
     """
-    global board, score, game_over, player_won, SIDE_MARGIN, TOP_MARGIN, DYNAMIC_BLOCK_SIZE, COLORS
+    global board, board_padded, label_sweep, board_surface, x_of_col, y_of_row, block_positions, block_tiles, board_dirty, score, selected_label, game_over, player_won, SIDE_MARGIN, TOP_MARGIN, DYNAMIC_BLOCK_SIZE, COLORS
 
     # Calculate available space for the board
     # Account for score text and buttons at the top, and some padding at the bottom
@@ -87,90 +121,69 @@ def create_board():
     if not COLORS: # Fallback if somehow 0 colors selected (shouldn't happen with min_colors check)
         COLORS = [(255,255,255)] # Default to white if no colors are picked
 
-    board = [[random.randint(0, current_num_colors - 1) for _ in range(current_board_width)] for _ in range(current_board_height)]
+    # The -2 border lets neighbour scans skip bounds checks, since it never equals a block color
+    board_padded = np.full((current_board_height + 2, current_board_width + 2), -2, dtype=np.int8)
+    board = board_padded[1:-1, 1:-1]
+    board[:] = np.random.randint(0, current_num_colors, size=(current_board_height, current_board_width), dtype=np.int8)
+    label_sweep = make_label_sweep(current_board_height, current_board_width)
+    board_surface = pygame.Surface((current_board_width * DYNAMIC_BLOCK_SIZE, current_board_height * DYNAMIC_BLOCK_SIZE))
+    board_dirty = True
+    x_of_col = [col * DYNAMIC_BLOCK_SIZE for col in range(current_board_width)]
+    y_of_row = [row * DYNAMIC_BLOCK_SIZE for row in range(current_board_height)]
+    block_positions = [(x, y) for y in y_of_row for x in x_of_col]
+
+    # Render one tile per color, border included, so drawing a block is a single blit
+    block_tiles = []
+    for color in COLORS:
+        tile = pygame.Surface((DYNAMIC_BLOCK_SIZE, DYNAMIC_BLOCK_SIZE))
+        tile.fill(color)
+        pygame.draw.rect(tile, (50, 50, 50), tile.get_rect(), 1) # Border
+        block_tiles.append(tile)
+
     score = 0
-    selected_blocks = [] # Clear selection on new game
+    selected_label = -1 # Clear selection on new game
     game_over = False
     player_won = False # Reset win status
+    relabel()
 
 def draw_board():
-    """Draws all blocks on the screen using DYNAMIC_BLOCK_SIZE."""
-    for row in range(current_board_height):
-        for col in range(current_board_width):
-            block_color_index = board[row][col]
-            if block_color_index != -1: # -1 indicates an empty/removed block
-                x = SIDE_MARGIN + col * DYNAMIC_BLOCK_SIZE
-                y = TOP_MARGIN + row * DYNAMIC_BLOCK_SIZE
-                color = COLORS[block_color_index]
-                pygame.draw.rect(screen, color, (x, y, DYNAMIC_BLOCK_SIZE, DYNAMIC_BLOCK_SIZE), 0)
-                # Draw a border for blocks
-                pygame.draw.rect(screen, (50, 50, 50), (x, y, DYNAMIC_BLOCK_SIZE, DYNAMIC_BLOCK_SIZE), 1)
-
-def find_connected_blocks(start_row, start_col, color_index):
     """
-    Performs a Breadth-First Search (BFS) to find all connected blocks
-    of the same color starting from (start_row, start_col).
-    Returns a list of (row, col) tuples for all connected blocks.
+    Draws all blocks on the screen using DYNAMIC_BLOCK_SIZE.
+    The blocks are rendered into board_surface only when the board is dirty;
+    otherwise the cached surface is blitted as-is.
     """
-    if not (0 <= start_row < current_board_height and 0 <= start_col < current_board_width):
-        return [] # Invalid starting position
-
-    if board[start_row][start_col] == -1 or board[start_row][start_col] != color_index:
-        return []
-
-    queue = [(start_row, start_col)]
-    visited = set([(start_row, start_col)])
-    connected = []
-
-    while queue:
-        r, c = queue.pop(0)
-        connected.append((r, c))
-
-        # Check neighbors (up, down, left, right)
-        neighbors = [(r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)]
-        for nr, nc in neighbors:
-            # Check bounds and if neighbor is same color and not visited
-            if 0 <= nr < current_board_height and 0 <= nc < current_board_width and \
-               board[nr][nc] == color_index and (nr, nc) not in visited:
-                visited.add((nr, nc))
-                queue.append((nr, nc))
-    return connected
+    global board_dirty
+    if board_dirty:
+        board_surface.fill(BACKGROUND_COLOR)
+        # Walk the board as one flat int8 run, visiting only the non-empty cells (-1 is empty)
+        flat_board = board.ravel()
+        filled = np.flatnonzero(flat_board != -1)
+        tiles = block_tiles # Bind to locals for the loop below
+        positions = block_positions
+        board_surface.blits(
+            [(tiles[block_color_index], positions[index])
+             for index, block_color_index in zip(filled.tolist(), flat_board[filled].tolist())],
+            doreturn=False)
+        board_dirty = False
+        dirty_rects.append(board_surface.get_rect(topleft=(SIDE_MARGIN, TOP_MARGIN)))
+    screen.blit(board_surface, (SIDE_MARGIN, TOP_MARGIN))
 
 def apply_gravity():
     """Makes blocks fall down to fill empty spaces."""
-    for col in range(current_board_width):
-        empty_slots = 0
-        for row in range(current_board_height - 1, -1, -1): # Iterate from bottom up
-            if board[row][col] == -1:
-                empty_slots += 1
-            elif empty_slots > 0:
-                # Move block down by the number of empty slots
-                board[row + empty_slots][col] = board[row][col]
-                board[row][col] = -1 # Clear original position
+    for c in range(current_board_width):
+        col = board[:, c] # View into the board, so writes go straight through
+        nonempty = col[col != -1]
+        col.fill(-1)
+        if nonempty.size:
+            # Stack the remaining blocks at the bottom, keeping their order
+            col[-nonempty.size:] = nonempty
 
 def shift_columns():
     """Shifts columns to the left if an entire column is empty."""
-    empty_cols_count = 0
-    new_board = [[-1 for _ in range(current_board_width)] for _ in range(current_board_height)]
-    current_new_col = 0
-
-    for col in range(current_board_width):
-        is_column_empty = True
-        for row in range(current_board_height):
-            if board[row][col] != -1:
-                is_column_empty = False
-                break
-        
-        if not is_column_empty:
-            # Copy non-empty column to the new board
-            for row in range(current_board_height):
-                new_board[row][current_new_col] = board[row][col]
-            current_new_col += 1
-            
-    # Overwrite the old board with the shifted new board
-    for row in range(current_board_height):
-        for col in range(current_board_width):
-            board[row][col] = new_board[row][col]
+    non_empty_mask = ~(board == -1).all(axis=0)
+    kept = board[:, non_empty_mask] # Fancy indexing returns a copy, safe to write back
+    board[:] = -1
+    board[:, :kept.shape[1]] = kept
 
 
 def calculate_score(num_removed_blocks):
@@ -182,11 +195,25 @@ def calculate_score(num_removed_blocks):
 
 def is_board_completely_empty():
     """Checks if the entire board is empty (all blocks are -1)."""
-    for r in range(current_board_height):
-        for c in range(current_board_width):
-            if board[r][c] != -1:
-                return False
-    return True
+    return bool((board == -1).all())
+
+def find_set(parent, index):
+    """Returns the root of the set containing index, compressing the path as it goes."""
+    while parent[index] != index:
+        parent[index] = parent[parent[index]] # Path halving
+        index = parent[index]
+    return index
+
+def union_sets(parent, size, a, b):
+    """Merges the sets containing a and b, attaching the smaller set to the larger."""
+    root_a = find_set(parent, a)
+    root_b = find_set(parent, b)
+    if root_a == root_b:
+        return
+    if size[root_a] < size[root_b]:
+        root_a, root_b = root_b, root_a
+    parent[root_b] = root_a
+    size[root_a] += size[root_b]
 
 def check_game_over():
     """
@@ -198,15 +225,90 @@ def check_game_over():
         player_won = True
         return True # Game is over because the board is empty
 
-    for r in range(current_board_height):
-        for c in range(current_board_width):
-            if board[r][c] != -1:
-                # Check if there are at least two connected blocks
-                connected = find_connected_blocks(r, c, board[r][c])
-                if len(connected) >= 2:
-                    return False # Possible move found
-    return True # No more moves, and board is not empty (player lost)
+    # Moves exist only while some group has at least two blocks
+    return max(label_sizes.values()) < 2 # True means no more moves (player lost)
 
+def make_label_sweep(height, width):
+    """
+    Builds the disjoint-set sweep for a board of the given size. The padded width and
+    the indices of the cells inside the border are fixed here, so the sweep itself reads
+    no globals. The sweep takes the flattened board_padded and returns the root of each
+    board cell, in row-major order.
+    """
+    padded_width = width + 2
+    cell_indices = [(r + 1) * padded_width + c + 1 for r in range(height) for c in range(width)]
+    padded_size = (height + 2) * padded_width
+
+    def sweep(padded_cells):
+        # Join each block with its left and upper neighbours when they share a color.
+        # The -2 border never matches, so no bounds checks are needed.
+        parent = list(range(padded_size))
+        size = [1] * padded_size
+        for index in cell_indices:
+            color_index = padded_cells[index]
+            if color_index == -1:
+                continue
+            if padded_cells[index - 1] == color_index:
+                union_sets(parent, size, index, index - 1)
+            if padded_cells[index - padded_width] == color_index:
+                union_sets(parent, size, index, index - padded_width)
+        return [find_set(parent, index) for index in cell_indices]
+
+    return sweep
+
+def relabel():
+    """
+    Labels every connected group on the board, to be called after each change to the board.
+    Fills labels, label_sizes and cells_by_label so clicks and check_game_over need no search.
+    """
+    global labels, label_sizes, cells_by_label
+
+    # Label connected groups in one disjoint-set sweep over plain Python ints.
+    # Each group is identified by the flat board_padded index of its root.
+    width = current_board_width
+    labels = np.array(label_sweep(board_padded.ravel().tolist()), dtype=np.int32).reshape(board.shape)
+    labels[board == -1] = -1
+
+    # Sort the non-empty cells by group, keeping row-major order inside each group
+    flat_labels = labels.ravel()
+    cells = np.flatnonzero(flat_labels != -1)
+    cells = cells[np.argsort(flat_labels[cells], kind="stable")]
+    group_ids, starts, counts = np.unique(flat_labels[cells], return_index=True, return_counts=True)
+    rows = (cells // width).astype(np.int16)
+    cols = (cells % width).astype(np.int16)
+
+    label_sizes = dict(zip(group_ids.tolist(), counts.tolist()))
+    cells_by_label = {
+        group_id: (rows[start:start + count], cols[start:start + count])
+        for group_id, start, count in zip(group_ids.tolist(), starts.tolist(), counts.tolist())
+    }
+
+
+def mark_dirty(key, state, rect):
+    """
+    Queues rect for the next display update if the element tracked under key
+    shows a different state than it did last frame. The area it covered
+    before is queued too, so a shrinking or moving element is cleaned up.
+    """
+    previous = drawn_state.get(key)
+    if previous is None or previous[0] != state:
+        dirty_rects.append(rect)
+        if previous is not None:
+            dirty_rects.append(previous[1])
+        drawn_state[key] = (state, rect)
+
+def update_display():
+    """Pushes only the areas queued this frame to the display."""
+    pygame.display.update(dirty_rects)
+    dirty_rects.clear()
+
+def render_text(text_font, text, color):
+    """Renders text with antialiasing, reusing the Surface if this exact text was rendered before."""
+    key = (text_font, text, color)
+    text_surface = text_cache.get(key)
+    if text_surface is None:
+        text_surface = text_cache[key] = text_font.render(text, True, color)
+    return text_surface
 
 def draw_button(rect, text, mouse_pos, clicked):
     """Draws a button and returns True if clicked."""
@@ -215,141 +317,136 @@ def draw_button(rect, text, mouse_pos, clicked):
     pygame.draw.rect(screen, color, rect, 0, 5) # Draw with rounded corners
     pygame.draw.rect(screen, TEXT_COLOR, rect, 2, 5) # Border
 
-    text_surface = medium_font.render(text, True, TEXT_COLOR)
+    text_surface = render_text(medium_font, text, TEXT_COLOR)
     text_rect = text_surface.get_rect(center=rect.center)
     screen.blit(text_surface, text_rect)
+    mark_dirty(("button", tuple(rect)), (text, is_hover), rect)
     return clicked and is_hover
 
 def settings_menu():
     """Displays and handles the settings menu."""
     global current_num_colors, current_board_width, current_board_height
 
+    mouse_pos = pygame.mouse.get_pos() # Kept up to date from mouse events below
     menu_running = True
     while menu_running:
-        mouse_pos = pygame.mouse.get_pos()
         clicked = False
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.MOUSEMOTION:
+                mouse_pos = event.pos
             if event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = event.pos
                 if event.button == 1: # Left click
                     clicked = True
+            if event.type == pygame.VIDEOEXPOSE:
+                drawn_state.clear() # Window contents were lost, repaint everything
 
         screen.fill(BACKGROUND_COLOR)
+        mark_dirty(("screen",), "settings", screen.get_rect())
 
         # Title
-        title_text = large_font.render("Game Settings", True, TEXT_COLOR)
+        title_text = render_text(large_font, "Game Settings", TEXT_COLOR)
         title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 50))
         screen.blit(title_text, title_rect)
 
-        y_offset = 150 # Starting Y position for options
-
         # Number of Colors Setting
-        num_colors_text = medium_font.render(f"Number of Colors: {current_num_colors}", True, TEXT_COLOR)
-        screen.blit(num_colors_text, (SCREEN_WIDTH // 2 - 150, y_offset))
+        num_colors_text = render_text(medium_font, f"Number of Colors: {current_num_colors}", TEXT_COLOR)
+        mark_dirty(("label", COLORS_ROW_Y), num_colors_text, screen.blit(num_colors_text, (SCREEN_WIDTH // 2 - 150, COLORS_ROW_Y)))
 
         # Buttons for changing number of colors
-        btn_minus_colors = pygame.Rect(SCREEN_WIDTH // 2 + 100, y_offset, 40, 30)
-        btn_plus_colors = pygame.Rect(SCREEN_WIDTH // 2 + 150, y_offset, 40, 30)
-
-        if draw_button(btn_minus_colors, "-", mouse_pos, clicked):
+        if draw_button(COLORS_MINUS_RECT, "-", mouse_pos, clicked):
             if current_num_colors > 4:
                 current_num_colors -= 1
-        if draw_button(btn_plus_colors, "+", mouse_pos, clicked):
+        if draw_button(COLORS_PLUS_RECT, "+", mouse_pos, clicked):
             if current_num_colors < len(ALL_POSSIBLE_COLORS):
                 current_num_colors += 1
 
-        y_offset += 70
-
         # Board Width Setting
-        board_width_text = medium_font.render(f"Board Width: {current_board_width}", True, TEXT_COLOR)
-        screen.blit(board_width_text, (SCREEN_WIDTH // 2 - 150, y_offset))
+        board_width_text = render_text(medium_font, f"Board Width: {current_board_width}", TEXT_COLOR)
+        mark_dirty(("label", WIDTH_ROW_Y), board_width_text, screen.blit(board_width_text, (SCREEN_WIDTH // 2 - 150, WIDTH_ROW_Y)))
 
         # Buttons for changing board width
-        btn_minus_width = pygame.Rect(SCREEN_WIDTH // 2 + 100, y_offset, 40, 30)
-        btn_plus_width = pygame.Rect(SCREEN_WIDTH // 2 + 150, y_offset, 40, 30)
-
-        if draw_button(btn_minus_width, "-", mouse_pos, clicked):
+        if draw_button(WIDTH_MINUS_RECT, "-", mouse_pos, clicked):
             if current_board_width > 5:
                 current_board_width -= 1
-        if draw_button(btn_plus_width, "+", mouse_pos, clicked):
+        if draw_button(WIDTH_PLUS_RECT, "+", mouse_pos, clicked):
             if current_board_width < 25: # Max reasonable width
                 current_board_width += 1
 
-        y_offset += 70
-
         # Board Height Setting
-        board_height_text = medium_font.render(f"Board Height: {current_board_height}", True, TEXT_COLOR)
-        screen.blit(board_height_text, (SCREEN_WIDTH // 2 - 150, y_offset))
+        board_height_text = render_text(medium_font, f"Board Height: {current_board_height}", TEXT_COLOR)
+        mark_dirty(("label", HEIGHT_ROW_Y), board_height_text, screen.blit(board_height_text, (SCREEN_WIDTH // 2 - 150, HEIGHT_ROW_Y)))
 
         # Buttons for changing board height
-        btn_minus_height = pygame.Rect(SCREEN_WIDTH // 2 + 100, y_offset, 40, 30)
-        btn_plus_height = pygame.Rect(SCREEN_WIDTH // 2 + 150, y_offset, 40, 30)
-
-        if draw_button(btn_minus_height, "-", mouse_pos, clicked):
+        if draw_button(HEIGHT_MINUS_RECT, "-", mouse_pos, clicked):
             if current_board_height > 5:
                 current_board_height -= 1
-        if draw_button(btn_plus_height, "+", mouse_pos, clicked):
+        if draw_button(HEIGHT_PLUS_RECT, "+", mouse_pos, clicked):
             if current_board_height < 20: # Max reasonable height
                 current_board_height += 1
 
-        y_offset += 100
-
         # Back Button
-        back_button_rect = pygame.Rect(SCREEN_WIDTH // 2 - 75, y_offset, 150, 50)
-        if draw_button(back_button_rect, "Back to Game", mouse_pos, clicked):
+        if draw_button(BACK_BUTTON_RECT, "Back to Game", mouse_pos, clicked):
             menu_running = False # Exit settings menu
 
-        pygame.display.flip()
+        update_display()
+        clock.tick(FPS) # Sleep off the rest of the frame
 
 
 # --- Main Game Loop ---
 def game_loop():
-    global score, selected_blocks, game_over, player_won
+    global score, selected_label, board_dirty, game_over, player_won
 
     game_state = "menu" # Initial state: "menu", "playing", "settings"
 
+    mouse_pos = pygame.mouse.get_pos() # Kept up to date from mouse events below
     running = True
     while running:
-        mouse_pos = pygame.mouse.get_pos()
         clicked = False
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.MOUSEMOTION:
+                mouse_pos = event.pos
             elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = event.pos
                 if event.button == 1: # Left click
                     clicked = True
             elif event.type == pygame.KEYDOWN:
                 if game_state == "playing" and game_over and event.key == pygame.K_r:
                     # Restart game
                     create_board()
-                    selected_blocks = []
+                    selected_label = -1
                     game_state = "playing" # Ensure state is playing after restart
+            elif event.type == pygame.VIDEOEXPOSE:
+                drawn_state.clear() # Window contents were lost, repaint everything
 
         screen.fill(BACKGROUND_COLOR) # Clear screen
+        mark_dirty(("screen",), game_state, screen.get_rect()) # Switching screens repaints everything
 
         if game_state == "menu":
             # Display Start Game button
-            start_button_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 50, 200, 60)
-            if draw_button(start_button_rect, "Start Game", mouse_pos, clicked):
+            if draw_button(START_BUTTON_RECT, "Start Game", mouse_pos, clicked):
                 create_board()
                 game_state = "playing"
 
             # Display Settings button
-            settings_button_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 30, 200, 60)
-            if draw_button(settings_button_rect, "Settings", mouse_pos, clicked):
+            if draw_button(SETTINGS_BUTTON_RECT, "Settings", mouse_pos, clicked):
                 game_state = "settings"
 
             # Title for menu
-            title_text = large_font.render("SameGame", True, TEXT_COLOR)
+            title_text = render_text(large_font, "SameGame", TEXT_COLOR)
             title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 150))
             screen.blit(title_text, title_rect)
 
         elif game_state == "settings":
             settings_menu()
+            mouse_pos = pygame.mouse.get_pos() # settings_menu consumed the mouse events meanwhile
             game_state = "menu" # After exiting settings, go back to main menu
 
         elif game_state == "playing":
@@ -361,46 +458,51 @@ def game_loop():
 
                 # Check if click is within board boundaries
                 if 0 <= row < current_board_height and 0 <= col < current_board_width:
-                    clicked_color_index = board[row][col]
+                    clicked_color_index = board[row, col]
 
                     if clicked_color_index != -1: # If a block is clicked
-                        # Find connected blocks
-                        current_selection = find_connected_blocks(row, col, clicked_color_index)
+                        # Look up the connected blocks found by the last relabel
+                        clicked_label = int(labels[row, col])
 
-                        if len(current_selection) >= 2: # Only select if 2 or more blocks
-                            if selected_blocks == current_selection:
+                        if label_sizes[clicked_label] >= 2: # Only select if 2 or more blocks
+                            if clicked_label == selected_label:
                                 # If the same group is clicked again, remove them
-                                for r, c in selected_blocks:
-                                    board[r][c] = -1 # Mark as empty
-                                score += calculate_score(len(current_selection))
-                                selected_blocks = [] # Clear selection
+                                sel_r, sel_c = cells_by_label[selected_label]
+                                board[sel_r, sel_c] = -1 # Mark as empty, one indexed store for the whole group
+                                score += calculate_score(label_sizes[selected_label])
+                                selected_label = -1 # Clear selection
 
                                 # Apply gravity and shift columns after removal
                                 apply_gravity()
                                 shift_columns()
+                                relabel()
+                                board_dirty = True # Removed blocks must be re-rendered
                                 game_over = check_game_over() # Check if game is over, and if player won
                             else:
                                 # New group selected, highlight them
-                                selected_blocks = current_selection
+                                selected_label = clicked_label
                         else:
                             # Clicked on a single block or isolated block, deselect
-                            selected_blocks = []
+                            selected_label = -1
 
             # --- Drawing for game board ---
             draw_board() # Draw all blocks
 
             # Draw selected blocks with a highlight
-            for r, c in selected_blocks:
-                x = SIDE_MARGIN + c * DYNAMIC_BLOCK_SIZE
-                y = TOP_MARGIN + r * DYNAMIC_BLOCK_SIZE
+            mark_dirty(("selection",), selected_label, board_surface.get_rect(topleft=(SIDE_MARGIN, TOP_MARGIN)))
+            sel_r, sel_c = cells_by_label.get(selected_label, NO_SELECTION)
+            for i in range(sel_r.size):
+                x = SIDE_MARGIN + x_of_col[sel_c[i]]
+                y = TOP_MARGIN + y_of_row[sel_r[i]]
                 # Draw a slightly lighter rectangle over the selected block
                 pygame.draw.rect(screen, HIGHLIGHT_COLOR, (x, y, DYNAMIC_BLOCK_SIZE, DYNAMIC_BLOCK_SIZE), 2) # 2 pixel border
 
             # Display score
-            score_text = font.render(f"Score: {score}", True, TEXT_COLOR)
-            screen.blit(score_text, (SIDE_MARGIN, 10))
+            score_text = render_text(font, f"Score: {score}", TEXT_COLOR)
+            mark_dirty(("score",), score_text, screen.blit(score_text, (SIDE_MARGIN, 10)))
 
             # Display game over/win message
+            result_rect = pygame.Rect(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, 0, 0)
             if game_over:
                 message_text = ""
                 message_color = (255, 50, 50) # Default to red for Game Over
@@ -410,20 +512,22 @@ def game_loop():
                 else:
                     message_text = "Game Over!"
 
-                game_result_text = large_font.render(message_text, True, message_color)
+                game_result_text = render_text(large_font, message_text, message_color)
                 text_rect = game_result_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
                 screen.blit(game_result_text, text_rect)
 
-                restart_text = font.render("Press R to Restart", True, TEXT_COLOR)
+                restart_text = render_text(font, "Press R to Restart", TEXT_COLOR)
                 restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
                 screen.blit(restart_text, restart_rect)
+                result_rect = text_rect.union(restart_rect)
+            mark_dirty(("result",), (game_over, player_won), result_rect)
 
             # Add a 'Quit' button for the game screen
-            quit_button_rect = pygame.Rect(SCREEN_WIDTH - 150, 10, 140, 40)
-            if draw_button(quit_button_rect, "Quit Game", mouse_pos, clicked):
+            if draw_button(QUIT_BUTTON_RECT, "Quit Game", mouse_pos, clicked):
                 game_state = "menu" # Go back to menu when quitting game
 
-        pygame.display.flip() # Update the full display Surface to the screen
+        update_display() # Push only the changed areas to the screen
+        clock.tick(FPS) # Sleep off the rest of the frame
 
     pygame.quit()
     sys.exit()